@@ -0,0 +1,41 @@
+from threadpool import DistributedThreadPool, DistributedWorker
+import multiprocessing as mp
+import time
+import pprint
+
+
+def worker_func(num1, num2):
+    time.sleep(0.1)
+    stuff = num1 * num2
+    return stuff
+
+
+def run_worker(host, port):
+    # on another machine, this is all you need, as long as it can reach the coordinator
+    dw = DistributedWorker(host, port, num_threads=4)
+    dw.set_worker(worker_func)
+    dw.run()
+
+
+if __name__ == "__main__":
+    num_seq1 = list(range(40))
+    num_seq2 = list(range(40, 80))
+
+    # use a dict with the parameter's name and value to pass in more than 1 parameter
+    work_to_be_done = [{"num1": num_seq1[i], "num2": num_seq2[i]} for i in range(len(num_seq1))]
+
+    # port 0 lets the OS pick a free port, use host="0.0.0.0" to accept workers from other machines
+    tp = DistributedThreadPool(work_to_be_done, host="127.0.0.1", port=0, chunk_size=8, verbose=True)
+    tp.start()
+
+    # spawn a few local worker processes for testing
+    workers = [mp.Process(target=run_worker, args=tp.get_address()) for _ in range(3)]
+    for p in workers:
+        p.start()
+
+    tp.sync()
+    for p in workers:
+        p.join()
+
+    print("Return value:")
+    pprint.pprint(tp.get_ret_val())
@@ -1 +1,2 @@
 from threadpool.threadpool import ThreadPool, DynamicThreadPool, ClockThread
+from threadpool.distributed import DistributedThreadPool, DistributedWorker
@@ -0,0 +1,733 @@
+import threading
+import time
+import multiprocessing as mp
+import queue
+import socket
+import struct
+import pickle
+import hmac
+import hashlib
+import os
+
+# frame header: message type (1 byte) + payload length (4 bytes), network byte order
+FRAME_HEADER = struct.Struct("!BI")
+FRAME_SEQ = struct.Struct("!Q")
+MAC_SIZE = hashlib.sha256().digest_size
+NONCE_SIZE = 32
+HANDSHAKE_MAGIC = b"TPDW"
+HANDSHAKE_TIMEOUT = 10
+
+MSG_TASK = 1
+MSG_RESULT = 2
+MSG_STOP = 3
+MSG_ERROR = 4
+MSG_HEARTBEAT = 5
+
+# chunks are identified by the index of their first item, sent in front of MSG_TASK, MSG_RESULT and MSG_ERROR bodies
+CHUNK_ID = struct.Struct("!Q")
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer.")
+        buf.extend(chunk)
+
+    return bytes(buf)
+
+
+def _mac(key, *parts):
+    return hmac.new(key, b"".join(parts), hashlib.sha256).digest()
+
+
+class FrameConnection:
+    def __init__(self, sock, session_key, is_coordinator):
+        """
+        A connection that sends and receives frames signed with a per-connection session key.
+        Each frame is: header, HMAC of (direction, sequence number, header, body), body.
+        Use coordinator_handshake/worker_handshake to create one.
+        :param sock: Connected socket
+        :param session_key: Key derived during the handshake
+        :param is_coordinator: Which side of the connection this is, frames are signed per direction
+        """
+        self.sock = sock
+        self.__session_key = session_key
+        self.__send_tag, self.__recv_tag = (b"C", b"W") if is_coordinator else (b"W", b"C")
+        self.__send_seq = 0
+        self.__recv_seq = 0
+        self.__send_lock = threading.Lock()
+
+    def send(self, msg_type, body=b""):
+        """
+        Sends a single frame.
+        :param msg_type: One of MSG_TASK, MSG_RESULT, MSG_STOP, MSG_ERROR, MSG_HEARTBEAT
+        :param body: Payload bytes, usually pickled
+        :return: None
+        """
+        header = FRAME_HEADER.pack(msg_type, len(body))
+        # several threads send on the same connection, frames and sequence numbers must not interleave
+        with self.__send_lock:
+            mac = _mac(self.__session_key, self.__send_tag, FRAME_SEQ.pack(self.__send_seq), header, body)
+            self.__send_seq += 1
+            self.sock.sendall(header + mac + body)
+
+    def recv(self):
+        """
+        Receives a single frame, the payload is only returned once its HMAC is verified.
+        :return: (msg_type, payload bytes)
+        """
+        header = _recv_exact(self.sock, FRAME_HEADER.size)
+        msg_type, length = FRAME_HEADER.unpack(header)
+        mac = _recv_exact(self.sock, MAC_SIZE)
+        body = _recv_exact(self.sock, length)
+
+        expected = _mac(self.__session_key, self.__recv_tag, FRAME_SEQ.pack(self.__recv_seq), header, body)
+        if not hmac.compare_digest(mac, expected):
+            raise ConnectionError("Frame failed authentication.")
+        self.__recv_seq += 1
+
+        return msg_type, body
+
+    def close(self):
+        self.sock.close()
+
+
+def coordinator_handshake(sock, authkey):
+    """
+    Challenge-response handshake, both sides prove they know the authkey without sending it.
+    :return: FrameConnection
+    """
+    coordinator_nonce = os.urandom(NONCE_SIZE)
+    sock.sendall(HANDSHAKE_MAGIC + coordinator_nonce)
+
+    answer = _recv_exact(sock, MAC_SIZE + NONCE_SIZE)
+    worker_mac, worker_nonce = answer[:MAC_SIZE], answer[MAC_SIZE:]
+    if not hmac.compare_digest(worker_mac, _mac(authkey, b"W", coordinator_nonce)):
+        raise ConnectionError("Worker failed authentication.")
+
+    sock.sendall(_mac(authkey, b"C", worker_nonce))
+
+    return FrameConnection(sock, _mac(authkey, coordinator_nonce, worker_nonce), True)
+
+
+def worker_handshake(sock, authkey):
+    """
+    Worker side of coordinator_handshake.
+    :return: FrameConnection
+    """
+    challenge = _recv_exact(sock, len(HANDSHAKE_MAGIC) + NONCE_SIZE)
+    if not challenge.startswith(HANDSHAKE_MAGIC):
+        raise ConnectionError("Peer is not a DistributedThreadPool coordinator.")
+    coordinator_nonce = challenge[len(HANDSHAKE_MAGIC):]
+
+    worker_nonce = os.urandom(NONCE_SIZE)
+    sock.sendall(_mac(authkey, b"W", coordinator_nonce) + worker_nonce)
+
+    if not hmac.compare_digest(_recv_exact(sock, MAC_SIZE), _mac(authkey, b"C", worker_nonce)):
+        raise ConnectionError("Coordinator failed authentication.")
+
+    return FrameConnection(sock, _mac(authkey, coordinator_nonce, worker_nonce), False)
+
+
+def _default_authkey(authkey):
+    # same default as multiprocessing, worker processes started with multiprocessing inherit it
+    if authkey is None:
+        authkey = mp.current_process().authkey
+    assert isinstance(authkey, bytes) and authkey, "Authkey must be non-empty bytes!"
+
+    return authkey
+
+
+class DistributedThreadPool:
+    def __init__(self, work, host="127.0.0.1", port=0, chunk_size=64, verbose=False, cache_return_val=True,
+                 authkey=None, heartbeat_timeout=30, max_retries=3, prefetch=2, worker_timeout=60):
+        """
+        Coordinator that hands out chunks of work over TCP to DistributedWorker processes.
+        Workers can live on other hosts, or on localhost for testing.
+        If a worker disconnects or stops sending heartbeats, its unfinished chunks are handed to other workers.
+        Every connection has to prove it knows the authkey, and every frame is signed with it.
+        :param work: Total work, this should be a list of all work, e.g.: [{}, {}, ...]
+        :param host: Address to listen on, use "0.0.0.0" to accept workers from other hosts
+        :param port: Port to listen on, set to 0 to let the OS decide (see get_address)
+        :param chunk_size: Number of work items sent to a worker at a time
+        :param verbose: Verbose, whether to print out stuff or not
+        :param cache_return_val: Whether to keep the return values of the worker
+        :param authkey: Shared secret (bytes), defaults to multiprocessing.current_process().authkey
+        :param heartbeat_timeout: Seconds without any frame from a busy worker before it counts as disconnected,
+                                  must be well above the workers' heartbeat_interval
+        :param max_retries: Number of times a chunk is retried after failing, before it is given up on
+        :param prefetch: Number of chunks a worker holds at a time, so it never waits for a round trip
+        :param worker_timeout: Seconds sync waits while work is left but no worker is connected, None waits forever
+        """
+        assert isinstance(chunk_size, int) and chunk_size > 0, "Chunk_size must be a positive integer!"
+        assert isinstance(max_retries, int) and max_retries >= 0, "Max_retries must be a non-negative integer!"
+        assert isinstance(prefetch, int) and prefetch > 0, "Prefetch must be a positive integer!"
+
+        self.total_work = work
+        self.host = host
+        self.port = port
+        self.chunk_size = chunk_size
+        self.verbose = verbose
+        self.cache_return_val = cache_return_val
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_retries = max_retries
+        self.prefetch = prefetch
+        self.worker_timeout = worker_timeout
+        self.__authkey = _default_authkey(authkey)
+
+        self.__total_progress = len(work)
+        self.__progress = 0
+        self.__print_lock = threading.Lock()
+        self.__result_lock = threading.Lock()
+        self.__return_val_cache = {}
+
+        # each chunk is a (start, end, number of failed attempts) index range into the total work
+        self.chunk_queue = queue.Queue()
+        for start in range(0, self.__total_progress, chunk_size):
+            self.chunk_queue.put((start, min(start + chunk_size, self.__total_progress), 0))
+
+        self.__remaining_chunks = self.chunk_queue.qsize()
+        self.__done_event = threading.Event()
+        if self.__remaining_chunks == 0:
+            self.__done_event.set()
+
+        self.__server_socket = None
+        self.__accept_thread = None
+        self.__thread_pool = []
+        self.__next_worker_id = 0
+        self.__num_connected = 0
+        self.__last_connected = None
+
+        if self.verbose:
+            print(f"DistributedThreadPool initialized with {self.__remaining_chunks} chunks.")
+
+    def __print_progress(self):
+        """
+        Prints the progress of the thread pool.
+        """
+        print(f"\r  DistributedThreadPool Progress Tracker: {self.__progress}/{self.__total_progress}.", end="")
+
+    def __finish_chunk(self, worker_id, start, end, ret_vals):
+        """
+        Merges the return values of a finished chunk into the return value cache.
+        ret_vals is a list of (ok, return value or error message), or None if the chunk was given up on.
+        """
+        with self.__result_lock:
+            cur_ret_vals = self.__return_val_cache.setdefault(f"thread {worker_id}", [])
+            for idx, (ok, cur_ret_val) in zip(range(start, end), ret_vals or []):
+                if not ok:
+                    print(f"An error occurred at worker {worker_id} on item {idx}: {cur_ret_val}")
+                elif (cur_ret_val is not None) and self.cache_return_val:
+                    cur_ret_vals.append({
+                        "param": self.total_work[idx],
+                        "iteration": idx,
+                        "return value": cur_ret_val
+                    })
+
+            self.__progress += end - start
+            self.__remaining_chunks -= 1
+            if self.__remaining_chunks == 0:
+                self.__done_event.set()
+
+        if self.verbose:
+            with self.__print_lock:
+                self.__print_progress()
+
+    def __retry_chunk(self, worker_id, start, end, num_failed, reason):
+        """
+        Puts a failed chunk back on the queue, or gives up on it after max_retries.
+        """
+        num_failed += 1
+        if num_failed > self.max_retries:
+            print(f"\nGiving up on items {start}-{end} after {num_failed} failed attempts, last error: {reason}")
+            self.__finish_chunk(worker_id, start, end, None)
+            return
+
+        if self.verbose:
+            print(f"\nChunk {start}-{end} failed at worker {worker_id}({reason}), reassigning.")
+        self.chunk_queue.put((start, end, num_failed))
+
+    def __send_chunks(self, worker_id, conn, in_flight):
+        """
+        Tops the worker up to prefetch chunks from the queue.
+        """
+        while len(in_flight) < self.prefetch and not self.__done_event.is_set():
+            try:
+                start, end, num_failed = self.chunk_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                body = pickle.dumps([self.total_work[idx] for idx in range(start, end)],
+                                    protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                # the work itself can't be sent, retrying won't help
+                self.__retry_chunk(worker_id, start, end, self.max_retries, f"pickling work failed: {e!r}")
+                continue
+
+            in_flight[start] = (end, num_failed)
+            conn.send(MSG_TASK, CHUNK_ID.pack(start) + body)
+
+    def __feed_worker(self, worker_id, conn, in_flight):
+        """
+        Keeps a worker busy until all work is done, results stream back as the worker finishes each chunk.
+        Raises on disconnects, missing heartbeats and garbage, the caller reassigns what is left in in_flight.
+        """
+        while True:
+            self.__send_chunks(worker_id, conn, in_flight)
+
+            if not in_flight:
+                if self.__done_event.is_set():
+                    return
+                # chunks held by other workers may still come back to the queue
+                self.__done_event.wait(0.05)
+                continue
+
+            msg_type, body = conn.recv()
+            if msg_type == MSG_HEARTBEAT:
+                continue
+            if msg_type not in (MSG_RESULT, MSG_ERROR) or len(body) < CHUNK_ID.size:
+                raise ConnectionError(f"Unexpected frame of type {msg_type}.")
+
+            start, = CHUNK_ID.unpack_from(body)
+            if start not in in_flight:
+                raise ConnectionError(f"Result for chunk {start} that was not sent to this worker.")
+            end, num_failed = in_flight.pop(start)
+
+            if msg_type == MSG_ERROR:
+                self.__retry_chunk(worker_id, start, end, num_failed,
+                                   body[CHUNK_ID.size:].decode("utf-8", errors="replace"))
+                continue
+
+            try:
+                ret_vals = pickle.loads(body[CHUNK_ID.size:])
+            except Exception as e:
+                self.__retry_chunk(worker_id, start, end, num_failed, f"results could not be unpickled: {e!r}")
+                continue
+
+            if not isinstance(ret_vals, list) or len(ret_vals) != end - start:
+                self.__retry_chunk(worker_id, start, end, num_failed, "unexpected results")
+                continue
+
+            self.__finish_chunk(worker_id, start, end, ret_vals)
+
+    def __connection_handler(self, worker_id, sock):
+        """
+        Feeds chunks to a single connected worker until all work is done.
+        Chunks that were in flight when the worker disconnected or went silent are put back on the queue.
+
+        :param worker_id: ID of the connected worker
+        :param sock: Socket connected to the worker
+        :return: None
+        """
+        with sock:
+            try:
+                sock.settimeout(HANDSHAKE_TIMEOUT)
+                conn = coordinator_handshake(sock, self.__authkey)
+            except OSError as e:
+                print(f"\nRejected worker {worker_id}: {e}")
+                return
+
+            # a busy worker sends heartbeats, so a timeout means it is gone (or hung)
+            sock.settimeout(self.heartbeat_timeout)
+
+            with self.__result_lock:
+                self.__num_connected += 1
+
+            in_flight = {}
+            try:
+                self.__feed_worker(worker_id, conn, in_flight)
+                conn.send(MSG_STOP)
+
+                # let the worker read the stop frame before the connection goes away
+                sock.shutdown(socket.SHUT_WR)
+                sock.settimeout(HANDSHAKE_TIMEOUT)
+                while sock.recv(4096):
+                    pass
+            except Exception as e:
+                # timeouts, disconnects and garbage all mean the worker can't be trusted with more work
+                for start, (end, num_failed) in in_flight.items():
+                    self.__retry_chunk(worker_id, start, end, num_failed, f"disconnected: {e!r}")
+            finally:
+                with self.__result_lock:
+                    self.__num_connected -= 1
+                    self.__last_connected = time.time()
+
+    def __accept_loop(self):
+        """
+        Accepts worker connections until all work is done.
+        """
+        while not self.__done_event.is_set():
+            try:
+                sock, addr = self.__server_socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            worker_id = self.__next_worker_id
+            self.__next_worker_id += 1
+
+            if self.verbose:
+                print(f"\nWorker {worker_id} connected from {addr[0]}:{addr[1]}.")
+
+            cur_thread = threading.Thread(
+                target=self.__connection_handler, args=(worker_id, sock,)
+            )
+            self.__thread_pool.append(cur_thread)
+            cur_thread.start()
+
+    def start(self):
+        """
+        Starts listening for workers, chunks are handed out as soon as workers connect.
+
+        :return: True once the coordinator is listening
+        """
+        self.__server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__server_socket.bind((self.host, self.port))
+        self.__server_socket.listen()
+        self.__server_socket.settimeout(0.1)
+        self.host, self.port = self.__server_socket.getsockname()[:2]
+        self.__last_connected = time.time()
+
+        if self.verbose:
+            print(f"Listening on {self.host}:{self.port}.")
+
+        self.__accept_thread = threading.Thread(target=self.__accept_loop)
+        self.__accept_thread.start()
+
+        return True
+
+    def sync(self):
+        """
+        Waits for all chunks to be processed and tells the connected workers to stop.
+        Gives up if work is left but no worker has been connected for worker_timeout seconds.
+
+        :return: True when all work has finished, False if the coordinator gave up
+        """
+        assert self.__accept_thread is not None, "Coordinator is not started!"
+
+        finished = True
+        while not self.__done_event.wait(0.5):
+            if self.worker_timeout is None:
+                continue
+
+            with self.__result_lock:
+                idle_time = time.time() - self.__last_connected if self.__num_connected == 0 else 0
+                if idle_time > self.worker_timeout:
+                    print(f"\nNo worker connected for {self.worker_timeout}s while {self.__remaining_chunks} "
+                          f"chunk(s) are left, giving up.")
+                    finished = False
+                    self.__done_event.set()
+
+        self.__accept_thread.join()
+        for t in self.__thread_pool:
+            t.join()
+        self.__server_socket.close()
+
+        if self.verbose:
+            print("\nAll workers synchronized.")
+
+        return finished
+
+    def get_address(self):
+        """
+        Get the address the coordinator is listening on, useful when port is 0.
+        :return: (host, port)
+        """
+        return self.host, self.port
+
+    def get_ret_val(self):
+        """
+        Retrieves the return values of all workers.
+
+        :return: A dict keyed by "thread <worker id>", where each value contains the return values of a single worker
+        """
+        assert self.cache_return_val, "cache_return_val is not set to True!"
+        return self.__return_val_cache
+
+    def set_verbose(self, option):
+        """
+        Sets the verbose flag outside the initialization process.
+        :param option: True/False
+        :return: None
+        """
+        self.verbose = option
+
+
+class DistributedWorker:
+    def __init__(self, host, port, num_threads=-1, verbose=False, connect_timeout=10, authkey=None,
+                 heartbeat_interval=5):
+        """
+        Worker process that pulls chunks of work from a DistributedThreadPool and runs them on a pool of threads.
+        Items of all received chunks share one local queue, and every chunk is sent back as soon as it is done.
+        :param host: Address of the coordinator
+        :param port: Port of the coordinator
+        :param num_threads: Number of threads to use, set to -1 to use all cpus
+        :param verbose: Verbose, whether to print out stuff or not
+        :param connect_timeout: Seconds to keep retrying the connection if the coordinator is not up yet
+        :param authkey: Shared secret (bytes), must match the coordinator's
+        :param heartbeat_interval: Seconds between heartbeats while chunks are running
+        """
+        assert num_threads != 0, "Num_threads must be -1 or a positive integer!"
+        assert num_threads >= -1, "Num_threads must be -1 or a positive integer!"
+        assert isinstance(num_threads, int), "Num_threads must be -1 or a positive integer!"
+
+        if num_threads == -1:
+            self.num_threads = mp.cpu_count()
+        else:
+            self.num_threads = num_threads
+
+        self.host = host
+        self.port = port
+        self.verbose = verbose
+        self.connect_timeout = connect_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.__authkey = _default_authkey(authkey)
+
+        self.__worker_set = False
+        self.__working_thread = None
+        self.__error = None
+
+        # per connection state, see __serve
+        self.__conn = None
+        self.__work_queue = None
+        self.__state_lock = threading.Lock()
+        self.__num_pending = 0
+        self.__broken_event = threading.Event()
+
+    @staticmethod
+    def __worker():
+        """
+        Placeholder for the worker function that will be set by the user.
+        """
+        return None
+
+    def set_worker(self, func):
+        """
+        Sets the worker, the worker should work on one item from the distributed work.
+        Please make sure the worker is thread-safe.
+        :param func: Function handle to the worker.
+        :return: None
+        """
+        assert callable(func), "Function provided is not callable!"
+
+        self.__worker = func
+        self.__worker_set = True
+
+    def __connect(self):
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection((self.host, self.port))
+            except OSError:
+                if time.time() >= deadline:
+                    raise
+                time.sleep(0.1)
+
+    def __fail(self, error):
+        """
+        Records the first error and shuts the connection down, which also stops the receiving loop.
+        """
+        with self.__state_lock:
+            if self.__error is None:
+                self.__error = error
+        self.__broken_event.set()
+
+        try:
+            self.__conn.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def __send(self, msg_type, body=b""):
+        try:
+            self.__conn.send(msg_type, body)
+        except OSError as e:
+            self.__fail(f"Lost connection to coordinator: {e!r}")
+
+    def __worker_wrapper(self, thread_id):
+        """
+        Runs items from the local queue until it gets None, and sends each chunk back once its last item is done.
+
+        :param thread_id: ID of the current thread
+        :return: None
+        """
+        while True:
+            job = self.__work_queue.get()
+            if job is None:
+                return
+
+            chunk, idx = job
+            # no point in running items whose results can't be sent anymore
+            if self.__broken_event.is_set():
+                continue
+
+            w = chunk["work"][idx]
+            try:
+                if isinstance(w, dict):
+                    chunk["ret_vals"][idx] = (True, self.__worker(**w))
+                else:
+                    chunk["ret_vals"][idx] = (True, self.__worker(w))
+            except Exception as e:
+                print(f"An error occurred at thread {thread_id}: {e}")
+                chunk["ret_vals"][idx] = (False, repr(e))
+
+            with self.__state_lock:
+                chunk["remaining"] -= 1
+                if chunk["remaining"] > 0:
+                    continue
+                self.__num_pending -= 1
+
+            self.__send(MSG_RESULT, CHUNK_ID.pack(chunk["start"]) + self.__dumps_ret_vals(chunk["ret_vals"]))
+
+    def __heartbeat(self):
+        """
+        Tells the coordinator this worker is alive while it has chunks, so long chunks are not reassigned.
+        """
+        while not self.__broken_event.wait(self.heartbeat_interval):
+            with self.__state_lock:
+                busy = self.__num_pending > 0
+            if busy:
+                self.__send(MSG_HEARTBEAT)
+
+    @staticmethod
+    def __dumps_ret_vals(ret_vals):
+        """
+        Pickles the return values, the ones that can't be pickled are replaced by an error.
+        """
+        try:
+            return pickle.dumps(ret_vals, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            pass
+
+        for idx, (ok, cur_ret_val) in enumerate(ret_vals):
+            try:
+                pickle.dumps(cur_ret_val, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                ret_vals[idx] = (False, f"Return value could not be pickled: {e!r}")
+
+        return pickle.dumps(ret_vals, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __receive_chunks(self):
+        """
+        Receives chunks from the coordinator and queues their items until told to stop.
+        """
+        while True:
+            try:
+                msg_type, body = self.__conn.recv()
+            except OSError as e:
+                self.__fail(f"Lost connection to coordinator: {e!r}")
+                return
+
+            if msg_type == MSG_STOP:
+                return
+
+            if msg_type != MSG_TASK or len(body) < CHUNK_ID.size:
+                self.__fail(f"Unexpected frame of type {msg_type} from coordinator.")
+                return
+
+            start, = CHUNK_ID.unpack_from(body)
+            try:
+                work = pickle.loads(body[CHUNK_ID.size:])
+            except Exception as e:
+                # e.g. a work item class that can't be imported here, let the coordinator decide
+                self.__send(MSG_ERROR, CHUNK_ID.pack(start) + f"Work could not be unpickled: {e!r}".encode("utf-8"))
+                continue
+
+            if not work:
+                self.__send(MSG_RESULT, CHUNK_ID.pack(start) + self.__dumps_ret_vals([]))
+                continue
+
+            chunk = {"start": start, "work": work, "ret_vals": [None] * len(work), "remaining": len(work)}
+            with self.__state_lock:
+                self.__num_pending += 1
+            for idx in range(len(work)):
+                self.__work_queue.put((chunk, idx))
+
+    def __serve(self):
+        """
+        Connects to the coordinator and works on its chunks until told to stop.
+        """
+        try:
+            sock = self.__connect()
+        except OSError as e:
+            self.__error = f"Could not connect to coordinator at {self.host}:{self.port}: {e!r}"
+            print(self.__error)
+            return
+
+        with sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            try:
+                sock.settimeout(HANDSHAKE_TIMEOUT)
+                self.__conn = worker_handshake(sock, self.__authkey)
+                sock.settimeout(None)
+            except OSError as e:
+                self.__error = f"Could not connect to coordinator at {self.host}:{self.port}: {e!r}"
+                print(self.__error)
+                return
+
+            if self.verbose:
+                print(f"Connected to coordinator at {self.host}:{self.port}.")
+
+            self.__work_queue = queue.Queue()
+            threads = [
+                threading.Thread(target=self.__worker_wrapper, args=(thread_id,))
+                for thread_id in range(self.num_threads)
+            ]
+            threads.append(threading.Thread(target=self.__heartbeat))
+            for t in threads:
+                t.start()
+
+            self.__receive_chunks()
+
+            # the coordinator only says stop once every chunk came back, so the queue is empty by now
+            for _ in range(self.num_threads):
+                self.__work_queue.put(None)
+            self.__broken_event.set()
+            for t in threads:
+                t.join()
+
+        if self.__error is not None:
+            print(self.__error)
+        elif self.verbose:
+            print("Coordinator finished, worker stopping.")
+
+    def start(self):
+        """
+        Connects to the coordinator and starts working in the background.
+        """
+        assert self.__worker_set, "Worker function is not set!"
+
+        self.__working_thread = threading.Thread(target=self.__serve)
+        self.__working_thread.start()
+
+    def sync(self):
+        """
+        Waits until the coordinator has no more work for this worker.
+        :return: True if the coordinator finished with this worker, False if the worker failed (see get_error)
+        """
+        if self.__working_thread is not None:
+            self.__working_thread.join()
+
+        return self.__error is None
+
+    def run(self):
+        """
+        Same as start + sync, handy as a multiprocessing.Process target.
+        :return: True if the coordinator finished with this worker, False if the worker failed (see get_error)
+        """
+        self.start()
+        return self.sync()
+
+    def get_error(self):
+        """
+        Get the reason the worker failed, if it did.
+        :return: Error message, or None
+        """
+        return self.__error
@@ -2,11 +2,16 @@ import threading
 import time
 import multiprocessing as mp
 import math
-import queue
+import random
+from collections.abc import Sequence
+
+# number of finished item durations SpeculativeTracker keeps to estimate the straggler threshold
+DURATION_SAMPLE_SIZE = 1024
 
 
 class ThreadPool:
-    def __init__(self, work, num_threads=-1, verbose=False, cache_return_val=True):
+    def __init__(self, work, num_threads=-1, verbose=False, cache_return_val=True, speculative=False,
+                 speculative_percentile=90):
         """
         A basic threadpool that does three things: distribute work, start work, sync.
         Make sure the worker is thread-safe, as this is a ThreadPool, not a monitor.
@@ -14,6 +19,9 @@ class ThreadPool:
         :param work: Total work, this should be a list of all work, e.g.: [{}, {}, ...]
         :param verbose: Verbose, whether to print out stuff or not
         :param mode: if num_threads is -1, then this decides how the final number of threads is determined
+        :param speculative: Once a thread runs out of work, let it re-run items that take unusually long.
+                            The first attempt to finish wins, so only use this with idempotent workers.
+        :param speculative_percentile: Items running longer than this percentile of finished items get re-run
         """
 
         # assert checks, order matters
@@ -21,9 +29,12 @@ class ThreadPool:
         assert num_threads >= -1, "Num_threads must be -1 or a positive integer!"
         assert isinstance(num_threads, int), "Num_threads must be -1 or a positive integer!"
 
+        # work is dispatched by index, so only copy it if it can't be indexed
+        self.total_work = work if isinstance(work, Sequence) else list(work)
+
         if num_threads == -1:
             max_num_threads = mp.cpu_count()
-            proper_num_threads = math.gcd(max_num_threads, len(work))
+            proper_num_threads = math.gcd(max_num_threads, len(self.total_work))
 
             # if the gcd is more than 75% of the cpu_count, then use that many threads, otherwise use all
             if proper_num_threads > int(max_num_threads * 0.75):
@@ -37,7 +48,6 @@ class ThreadPool:
         else:
             self.num_threads = num_threads
 
-        self.total_work = work
         self.__stop_event = threading.Event()
 
         # printing
@@ -45,16 +55,26 @@ class ThreadPool:
         self.__progress = 0
         self.__total_time_elapsed = 0
         self.__print_lock = threading.Lock()
-        self.__total_progress = len(work)
+        self.__total_progress = len(self.total_work)
 
-        self.distributed_work = self.distribute_work(work)
+        # thread i works on items i, i + num_threads, ..., the lists are only built when asked for
+        self.__distributed_work = None
         self.__return_val_cache = {}
 
-        if self.verbose:
-            print("Work distributed.")
+        self.__speculative_tracker = None
+        if speculative:
+            self.__speculative_tracker = SpeculativeTracker(len(self.total_work), speculative_percentile)
 
-        # internal threadpool list
+            # per thread, the owner takes items from the front while idle threads take them from the back
+            self.__claim_lock = threading.Lock()
+            self.__claim_next = [0] * self.num_threads
+            self.__claim_end = [self.__num_items(thread_id) for thread_id in range(self.num_threads)]
+
+        # internal threadpool list, worker threads are spawned as work is claimed
         self.__thread_pool = []
+        self.__speculative_threads = set()
+        self.__spawn_lock = threading.Lock()
+        self.__num_spawned = 0
 
         # please don't modify this
         self.__worker_set = False
@@ -63,6 +83,21 @@ class ThreadPool:
         if self.verbose:
             print("ThreadPool initialized.")
 
+    @property
+    def distributed_work(self):
+        """
+        The work of each thread as a list of lists, built on first access.
+        The threads themselves read their work straight from total_work, so this is only for inspection.
+        """
+        if self.__distributed_work is None:
+            self.__distributed_work = self.distribute_work(self.total_work)
+
+        return self.__distributed_work
+
+    @distributed_work.setter
+    def distributed_work(self, value):
+        self.__distributed_work = value
+
     def distribute_work(self, total_work):
         """
         Distributes the given work among threads evenly.
@@ -77,6 +112,12 @@ class ThreadPool:
 
         return temp_split
 
+    def __num_items(self, thread_id):
+        """
+        Number of items of the total work that belong to the given thread.
+        """
+        return max(len(self.total_work) - thread_id + self.num_threads - 1, 0) // self.num_threads
+
     def add_thread(self, worker, *args):
         if callable(worker):
             cur_thread = threading.Thread(
@@ -109,77 +150,202 @@ class ThreadPool:
 
         print(f"\r  ThreadPool Progress Tracker: {self.__progress}/{self.__total_progress}, est: {est_remaining_time:.2f}s.", end="")
 
-    def __worker_wrapper(self, thread_id, work):
+    def __worker_wrapper(self, thread_id):
         """
         Wrapper for the worker function that iterated through the distributed work.
         It also handles error catching and progress tracking.
 
         :param thread_id: ID of the current thread
-        :param work: List of work for the current thread
         :return: True if no errors occurred, False otherwise
         """
 
-        # List to store the return values of each work item processed by this thread
-        for idx, w in enumerate(work):
+        # this thread has work, so let the next one start on its share
+        self.__spawn_worker_thread()
+
+        for idx, work_idx in enumerate(range(thread_id, len(self.total_work), self.num_threads)):
+            w = self.total_work[work_idx]
+
             if self.__stop_event.is_set():
                 if self.verbose:
                     print()
                     print(f"\rStop event triggered, stopping thread {thread_id}...")
                 return False
 
+            # the rest of this thread's work was taken over by idle threads
+            if self.__speculative_tracker is not None and not self.__claim_own(thread_id, idx, w):
+                break
+
             ite_start = time.time()
             try:
-                if isinstance(w, dict):
-                    # if the arg type is dict, then we unpack the dict so the function sees the parameters as they were
-                    cur_ret_val = self.__worker(**w)
-                else:
-                    # if the arg type is list or anything else, just pass it in
-                    cur_ret_val = self.__worker(w)
+                cur_ret_val = self.__call_worker(w)
             except Exception as e:
                 print(f"A fatal error({e}) occurred at thread {thread_id}.")
+                if self.__speculative_tracker is not None:
+                    # a speculative attempt that is still running may succeed
+                    self.__speculative_tracker.fail(work_idx)
                 return False
 
             ite_end = time.time()
 
-            # create the array if it's the first iteration
-            if f"thread {thread_id}" not in self.__return_val_cache:
-                self.__return_val_cache[f"thread {thread_id}"] = []
+            # a speculative attempt of this item finished first, ignore this result
+            if self.__speculative_tracker is not None and \
+                    not self.__speculative_tracker.finish(work_idx, ite_end - ite_start):
+                continue
+
+            self.__store_ret_val(thread_id, w, idx, cur_ret_val, ite_end - ite_start)
+
+        return True
+
+    def __speculative_worker_wrapper(self, thread_id):
+        """
+        Runs the thread's own work, then helps the other threads until all work is done.
+        Work that another thread has not started yet is taken over first, then stragglers are re-run.
 
-            # Store the return value of the worker function, if it exists
-            if (cur_ret_val is not None) and self.cache_return_val:
-                self.__return_val_cache[f"thread {thread_id}"].append({
-                    "param": w,
-                    "iteration": idx,
-                    "return value": cur_ret_val
-                })
+        :param thread_id: ID of the current thread
+        :return: True if no errors occurred in the thread's own work, False otherwise
+        """
+        tracker = self.__speculative_tracker
 
-            # Print progress update, if verbose mode is enabled
-            if self.verbose:
-                # Lock the print statement to prevent other threads from interrupting it
-                self.__print_lock.acquire()
+        ret_val = self.__worker_wrapper(thread_id)
 
-                self.__progress += 1
-                self.__total_time_elapsed += ite_end - ite_start
-                self.__print_progress()
+        while not (self.__stop_event.is_set() or tracker.all_done.is_set()):
+            stolen = self.__steal_work()
+            if stolen is not None:
+                work_idx, w, idx = stolen
+            else:
+                straggler = tracker.pick_straggler()
+                if straggler is None:
+                    tracker.all_done.wait(0.05)
+                    continue
 
-                self.__print_lock.release()
+                work_idx, w, idx = straggler
 
-        return True
+            ite_start = time.time()
+            try:
+                cur_ret_val = self.__call_worker(w)
+            except Exception as e:
+                print(f"An error({e}) occurred in a speculative attempt at thread {thread_id}.")
+                tracker.fail(work_idx)
+                continue
+
+            ite_end = time.time()
+            if tracker.finish(work_idx, ite_end - ite_start):
+                self.__store_ret_val(thread_id, w, idx, cur_ret_val, ite_end - ite_start)
+
+        return ret_val
+
+    def __claim_own(self, thread_id, idx, w):
+        """
+        Claims the next item of the thread's own work, unless it was already taken by an idle thread.
+        """
+        with self.__claim_lock:
+            if idx >= self.__claim_end[thread_id]:
+                return False
+
+            self.__claim_next[thread_id] = idx + 1
+            self.__speculative_tracker.begin(idx * self.num_threads + thread_id, w, idx)
+            return True
+
+    def __steal_work(self):
+        """
+        Takes the last unstarted item from the thread with the most unstarted work.
+        :return: (index within total work, work item, iteration) or None if every item has been started
+        """
+        with self.__claim_lock:
+            victim = max(range(self.num_threads), key=lambda t: self.__claim_end[t] - self.__claim_next[t])
+            if self.__claim_end[victim] <= self.__claim_next[victim]:
+                return None
+
+            self.__claim_end[victim] -= 1
+            idx = self.__claim_end[victim]
+
+            # register the item before releasing the lock, so it is never neither claimable nor in flight
+            work_idx = idx * self.num_threads + victim
+            w = self.total_work[work_idx]
+            self.__speculative_tracker.begin(work_idx, w, idx)
+
+        return work_idx, w, idx
+
+    def __call_worker(self, w):
+        """
+        Calls the worker function on a single work item.
+        """
+        if isinstance(w, dict):
+            # if the arg type is dict, then we unpack the dict so the function sees the parameters as they were
+            return self.__worker(**w)
+
+        # if the arg type is list or anything else, just pass it in
+        return self.__worker(w)
+
+    def __store_ret_val(self, thread_id, w, idx, cur_ret_val, time_elapsed):
+        """
+        Stores the return value of a finished work item and updates the progress.
+        """
+        # create the array if it's the first iteration
+        if f"thread {thread_id}" not in self.__return_val_cache:
+            self.__return_val_cache[f"thread {thread_id}"] = []
+
+        # Store the return value of the worker function, if it exists
+        if (cur_ret_val is not None) and self.cache_return_val:
+            self.__return_val_cache[f"thread {thread_id}"].append({
+                "param": w,
+                "iteration": idx,
+                "return value": cur_ret_val
+            })
+
+        # Print progress update, if verbose mode is enabled
+        if self.verbose:
+            # Lock the print statement to prevent other threads from interrupting it
+            self.__print_lock.acquire()
+
+            self.__progress += 1
+            self.__total_time_elapsed += time_elapsed
+            self.__print_progress()
+
+            self.__print_lock.release()
 
     def create_thread_pool(self):
         """
         Creates threadpool with the default worker.
+        Only the first thread is created here, every thread spawns (and starts) the next one once it starts on
+        its work, so threads are only created for work that is being worked on.
         :return: thread_pool if worker is set, otherwise none
         """
 
-        for thread_id in range(self.num_threads):
-            cur_thread = threading.Thread(
-                target=self.__worker_wrapper, args=(thread_id, self.distributed_work[thread_id],)
-            )
-            self.__thread_pool.append(cur_thread)
+        self.__spawn_worker_thread(start=False)
 
         return None
 
+    def __spawn_worker_thread(self, start=True):
+        """
+        Creates the next worker thread, unless every thread that has work is already created.
+
+        :param start: Whether to start the thread right away
+        :return: The created thread, or None
+        """
+        with self.__spawn_lock:
+            thread_id = self.__num_spawned
+            if thread_id >= min(self.num_threads, len(self.total_work)):
+                return None
+            self.__num_spawned += 1
+
+            if self.__speculative_tracker is None:
+                cur_thread = threading.Thread(
+                    target=self.__worker_wrapper, args=(thread_id,)
+                )
+            else:
+                # losing attempts can't be cancelled, so don't let them keep the program alive
+                cur_thread = threading.Thread(
+                    target=self.__speculative_worker_wrapper, args=(thread_id,), daemon=True
+                )
+                self.__speculative_threads.add(cur_thread)
+            self.__thread_pool.append(cur_thread)
+
+        if start:
+            cur_thread.start()
+
+        return cur_thread
+
     def set_default_worker(self, func):
         """
         Sets the default worker, the worker should work on one item from the distributed work.
@@ -193,16 +359,23 @@ class ThreadPool:
 
         self.create_thread_pool()
 
+        if self.__speculative_tracker is not None:
+            # worker threads are daemons in speculative mode, this one keeps the program alive until the work is done
+            self.__thread_pool.append(threading.Thread(target=self.__wait_for_work))
+
         self.__worker_set = True
 
     def start(self):
         """
         Starts all threads in the thread pool.
+        In speculative mode the worker threads are daemons, a helper thread keeps the program alive until every
+        work item is done, but not for losing attempts.
 
         :return: True if the worker function is set and threads are started, False otherwise
         """
 
-        for t in self.__thread_pool:
+        # worker threads append (and start) the threads they spawn, so only start the ones that are here now
+        for t in list(self.__thread_pool):
             t.start()
 
         return True
@@ -210,21 +383,46 @@ class ThreadPool:
     def sync(self):
         """
         Waits for all threads in the thread pool to finish execution.
+        In speculative mode, this returns once every work item is done (or the pool is stopped) without joining the
+        worker threads: they are daemons, and a thread still busy with a losing attempt is left to finish it in the
+        background, or is killed when the program exits.
 
         :return: True when all threads have finished execution
         """
 
         for t in self.__thread_pool:
-            t.join()
+            if t not in self.__speculative_threads:
+                t.join()
 
         if self.verbose:
-            print("\nAll threads synchronized.")
+            if self.__speculative_tracker is None:
+                print("\nAll threads synchronized.")
+            elif self.__stop_event.is_set():
+                print(f"\nStopped, {self.__count_busy_threads()} thread(s) still finishing their current item.")
+            else:
+                print(f"\nAll work done, {self.__count_busy_threads()} thread(s) still running a losing attempt.")
 
         return True
 
+    def __wait_for_work(self):
+        """
+        Waits until every work item is done or the pool is stopped, used in speculative mode only.
+        """
+        while not (self.__stop_event.is_set() or self.__speculative_tracker.all_done.wait(0.1)):
+            pass
+
+    def __count_busy_threads(self):
+        """
+        Number of speculative worker threads that are still running.
+        """
+        return sum(t.is_alive() for t in self.__speculative_threads)
+
     def get_thread_pool(self):
         """
-        Get the created threadpool, if you want to manage it yourself.
+        Get the created threadpool.
+        Worker threads are spawned lazily: before start() this only holds the first worker thread (and threads
+        added with add_thread), and starting that thread also starts the others. The list grows while the pool runs,
+        so call this after sync() to see every thread.
         :return: created threadpool
         """
         return self.__thread_pool
@@ -249,6 +447,7 @@ class ThreadPool:
         """
         Clears the thread pool and resets all settings to defaults.
         This function stops all executing threads.
+        In speculative mode, it does not wait for threads that are still busy with an item, see sync.
         """
         self.__stop_event.set()
         self.sync()
@@ -281,7 +480,8 @@ class ThreadPool:
 
 
 class DynamicThreadPool:
-    def __init__(self, work, num_threads=-1, verbose=False, cache_return_val=True):
+    def __init__(self, work, num_threads=-1, verbose=False, cache_return_val=True, speculative=False,
+                 speculative_percentile=90):
         assert num_threads != 0, "Num_threads must be -1 or a positive integer!"
         assert num_threads >= -1, "Num_threads must be -1 or a positive integer!"
         assert isinstance(num_threads, int), "Num_threads must be -1 or a positive integer!"
@@ -293,14 +493,16 @@ class DynamicThreadPool:
 
         self.verbose = verbose
 
-        self.work_queue = queue.Queue()
-        self.__total_progress = len(work)
-
-        for w in work:
-            self.work_queue.put(w)
+        # threads claim work by a shared index into the total work, so only copy it if it can't be indexed
+        self.total_work = work if isinstance(work, Sequence) else list(work)
+        self.__total_progress = len(self.total_work)
+        self.__claim_lock = threading.Lock()
+        self.__next_work = 0
 
         self.__worker_set = False
         self.__thread_pool = []
+        self.__spawn_lock = threading.Lock()
+        self.__num_spawned = 0
         self.__stop_event = threading.Event()
         self.__print_lock = threading.Lock()
         self.__total_time = 0
@@ -308,20 +510,11 @@ class DynamicThreadPool:
         self.cache_return_val = cache_return_val
         self.__progress = 0
 
-    @staticmethod
-    def __queue_to_list(q):
-        """
-        Only call this function after all work is done.
-        :param q: queue
-        :return: list of the queue
-        """
-        queue_list = []
-        while not q.empty():
-            item = q.get()
-            queue_list.append(item)
-            q.put(item)
-
-        return queue_list
+        # see ThreadPool for what speculative mode does
+        self.__speculative_tracker = None
+        self.__speculative_threads = set()
+        if speculative:
+            self.__speculative_tracker = SpeculativeTracker(len(self.total_work), speculative_percentile)
 
     @staticmethod
     def __worker():
@@ -352,37 +545,97 @@ class DynamicThreadPool:
         :param thread_id: ID of the current thread
         :return: None
         """
-        while not self.work_queue.empty():
+        tracker = self.__speculative_tracker
+        spawned_next = False
+
+        while True:
             start_time = time.time()
+            with self.__claim_lock:
+                key = self.__next_work
+                if key >= len(self.total_work):
+                    break
+                self.__next_work += 1
+
+                cur_work = self.total_work[key]
+                if tracker is not None:
+                    tracker.begin(key, cur_work, thread_id)
+
+            # this thread got work, so there may be enough work for one more thread
+            if not spawned_next:
+                self.__spawn_worker_thread()
+                spawned_next = True
+
             try:
-                cur_work = self.work_queue.get()
+                cur_ret_val = self.__call_worker(cur_work)
 
-                if isinstance(cur_work, dict):
-                    cur_ret_val = self.__worker(**cur_work)
-                else:
-                    cur_ret_val = self.__worker(cur_work)
-
-                # create the array if it's the first iteration
-                if f"thread {thread_id}" not in self.__return_val_cache:
-                    self.__return_val_cache[f"thread {thread_id}"] = []
-
-                # Store the return value of the worker function, if it exists
-                if (cur_ret_val is not None) and self.cache_return_val:
-                    self.__return_val_cache[f"thread {thread_id}"].append({
-                        "param": cur_work,
-                        "iteration": thread_id,
-                        "return value": cur_ret_val
-                    })
-
-                end_time = time.time()
-                self.__total_time += (end_time - start_time)
-
-                self.__print_progress()
-                self.__progress += 1
-                self.work_queue.task_done()
+                # a speculative attempt of this item may have finished first, then ignore this result
+                if tracker is None or tracker.finish(key, time.time() - start_time):
+                    self.__store_ret_val(thread_id, cur_work, cur_ret_val, start_time)
             except Exception as e:
                 print(f"An error occurred at thread {thread_id}: {e}")
-                self.work_queue.task_done()
+                if tracker is not None:
+                    # a speculative attempt that is still running may succeed
+                    tracker.fail(key)
+
+    def __speculative_worker_wrapper(self, thread_id):
+        """
+        Works on the shared work until all of it is claimed, then re-runs stragglers of other threads until all work is done.
+
+        :param thread_id: ID of the current thread
+        :return: None
+        """
+        tracker = self.__speculative_tracker
+
+        self.__worker_wrapper(thread_id)
+
+        while not (self.__stop_event.is_set() or tracker.all_done.is_set()):
+            straggler = tracker.pick_straggler()
+            if straggler is None:
+                tracker.all_done.wait(0.05)
+                continue
+
+            key, cur_work, _ = straggler
+            start_time = time.time()
+            try:
+                cur_ret_val = self.__call_worker(cur_work)
+            except Exception as e:
+                print(f"An error occurred in a speculative attempt at thread {thread_id}: {e}")
+                tracker.fail(key)
+                continue
+
+            if tracker.finish(key, time.time() - start_time):
+                self.__store_ret_val(thread_id, cur_work, cur_ret_val, start_time)
+
+    def __call_worker(self, cur_work):
+        """
+        Calls the worker function on a single work item.
+        """
+        if isinstance(cur_work, dict):
+            return self.__worker(**cur_work)
+
+        return self.__worker(cur_work)
+
+    def __store_ret_val(self, thread_id, cur_work, cur_ret_val, start_time):
+        """
+        Stores the return value of a finished work item and updates the progress.
+        """
+        # create the array if it's the first iteration
+        if f"thread {thread_id}" not in self.__return_val_cache:
+            self.__return_val_cache[f"thread {thread_id}"] = []
+
+        # Store the return value of the worker function, if it exists
+        if (cur_ret_val is not None) and self.cache_return_val:
+            self.__return_val_cache[f"thread {thread_id}"].append({
+                "param": cur_work,
+                "iteration": thread_id,
+                "return value": cur_ret_val
+            })
+
+        end_time = time.time()
+        self.__total_time += (end_time - start_time)
+
+        self.__print_progress()
+        self.__progress += 1
 
     def set_worker(self, func):
         """
@@ -395,32 +648,82 @@ class DynamicThreadPool:
 
         self.__worker = func
 
-        for thread_id in range(self.num_threads):
-            cur_thread = threading.Thread(
-                target=self.__worker_wrapper, args=(thread_id,)
-            )
-            self.__thread_pool.append(cur_thread)
+        # only the first thread is created here, every thread spawns the next one once it claims work
+        self.__spawn_worker_thread(start=False)
+
+        if self.__speculative_tracker is not None:
+            # worker threads are daemons in speculative mode, this one keeps the program alive until the work is done
+            self.__thread_pool.append(threading.Thread(target=self.__wait_for_work))
 
         self.__worker_set = True
 
+    def __spawn_worker_thread(self, start=True):
+        """
+        Creates the next worker thread, unless num_threads threads are already created.
+
+        :param start: Whether to start the thread right away
+        :return: The created thread, or None
+        """
+        with self.__spawn_lock:
+            # not len(self.__thread_pool), clear_thread_pool empties that list while threads may still run
+            thread_id = self.__num_spawned
+            if thread_id >= self.num_threads:
+                return None
+            self.__num_spawned += 1
+
+            if self.__speculative_tracker is None:
+                cur_thread = threading.Thread(
+                    target=self.__worker_wrapper, args=(thread_id,)
+                )
+            else:
+                # losing attempts can't be cancelled, so don't let them keep the program alive
+                cur_thread = threading.Thread(
+                    target=self.__speculative_worker_wrapper, args=(thread_id,), daemon=True
+                )
+                self.__speculative_threads.add(cur_thread)
+            self.__thread_pool.append(cur_thread)
+
+        if start:
+            cur_thread.start()
+
+        return cur_thread
+
+    def __wait_for_work(self):
+        """
+        Waits until every work item is done or the pool is stopped, used in speculative mode only.
+        """
+        while not (self.__stop_event.is_set() or self.__speculative_tracker.all_done.wait(0.1)):
+            pass
+
     def sync(self):
+        # in speculative mode, return once every work item is done without joining the (daemon) worker threads,
+        # a thread still busy with a losing attempt finishes it in the background or is killed at exit
         for t in self.__thread_pool:
-            t.join()
+            if t not in self.__speculative_threads:
+                t.join()
         if self.verbose:
-            print("\nAll threads synchronized.")
+            if self.__speculative_tracker is None:
+                print("\nAll threads synchronized.")
+            else:
+                busy = sum(t.is_alive() for t in self.__speculative_threads)
+                if self.__stop_event.is_set():
+                    print(f"\nStopped, {busy} thread(s) still finishing their current item.")
+                else:
+                    print(f"\nAll work done, {busy} thread(s) still running a losing attempt.")
 
     def start(self):
         assert self.__worker_set, "Worker function is not set!"
-        for t in self.__thread_pool:
+        # in speculative mode the worker threads are daemons, see set_worker for what keeps the program alive
+        # worker threads append (and start) the threads they spawn, so only start the ones that are here now
+        for t in list(self.__thread_pool):
             t.start()
 
     def clear_thread_pool(self):
-        while not self.work_queue.empty():
-            try:
-                self.work_queue.get(False)
-            except queue.Empty:
-                continue
-            self.work_queue.task_done()
+        # mark all work as claimed so the threads stop after their current item
+        with self.__claim_lock:
+            self.__next_work = len(self.total_work)
+        if self.__speculative_tracker is not None:
+            self.__speculative_tracker.cancel()
         self.__thread_pool = []
         self.__worker_set = False
 
@@ -516,6 +819,128 @@ class ClockThread:
             time.sleep(1)
 
 
+class SpeculativeTracker:
+    def __init__(self, total_work, percentile=90):
+        """
+        Keeps track of in-flight work items so that idle threads can re-run the stragglers.
+        An item counts as a straggler once it has run longer than the given percentile of finished items.
+        The first attempt to finish wins, the result of any later attempt is ignored.
+        :param total_work: Total number of work items
+        :param percentile: Percentile of finished item durations used as straggler threshold, (0, 100]
+        """
+        assert 0 < percentile <= 100, "Percentile must be in (0, 100]!"
+
+        self.percentile = percentile
+        self.all_done = threading.Event()
+
+        self.__lock = threading.Lock()
+        self.__remaining = total_work
+        # key -> [start time, work item, iteration, number of attempts, number of running attempts]
+        self.__in_flight = {}
+        # a bounded random sample of finished item durations, so memory and sorting don't grow with the work
+        self.__durations = []
+        self.__num_durations = 0
+        self.__threshold = None
+        self.__threshold_samples = 0
+
+        if total_work == 0:
+            self.all_done.set()
+
+    def begin(self, key, work, iteration):
+        """
+        Registers the first attempt of a work item.
+        Call this while the item is still claimed under the caller's lock, so it is never untracked.
+        """
+        with self.__lock:
+            self.__in_flight[key] = [time.time(), work, iteration, 1, 1]
+
+    def finish(self, key, elapsed):
+        """
+        Marks a work item as finished.
+        :return: True if this is the first attempt to finish, False if the result should be ignored
+        """
+        with self.__lock:
+            if self.__in_flight.pop(key, None) is None:
+                return False
+
+            self.__remaining -= 1
+            self.__add_duration(elapsed)
+            self.__check_done()
+
+            return True
+
+    def fail(self, key):
+        """
+        Marks an attempt of a work item as failed.
+        The item only counts as done once no other attempt of it is still running.
+        """
+        with self.__lock:
+            attempt = self.__in_flight.get(key)
+            if attempt is None:
+                return
+
+            attempt[4] -= 1
+            if attempt[4] == 0:
+                del self.__in_flight[key]
+                self.__remaining -= 1
+                self.__check_done()
+
+    def cancel(self):
+        """
+        Gives up on the items that are left, e.g. when the thread pool is cleared.
+        """
+        self.all_done.set()
+
+    def pick_straggler(self):
+        """
+        Picks the longest running item that is over the threshold and has not been duplicated yet.
+        :return: (key, work item, iteration) or None if there is nothing worth re-running
+        """
+        with self.__lock:
+            if not self.__durations:
+                return None
+
+            if self.__num_durations != self.__threshold_samples:
+                durations = sorted(self.__durations)
+                self.__threshold = durations[max(math.ceil(len(durations) * self.percentile / 100) - 1, 0)]
+                self.__threshold_samples = self.__num_durations
+
+            now = time.time()
+            straggler = None
+            for key, attempt in self.__in_flight.items():
+                start, work, iteration, num_attempts, num_running = attempt
+                if num_attempts > 1 or now - start <= self.__threshold:
+                    continue
+                if straggler is None or start < self.__in_flight[straggler][0]:
+                    straggler = key
+
+            if straggler is None:
+                return None
+
+            attempt = self.__in_flight[straggler]
+            attempt[3] += 1
+            attempt[4] += 1
+
+            return straggler, attempt[1], attempt[2]
+
+    def __add_duration(self, elapsed):
+        # must be called with the lock held
+        # reservoir sampling, every finished item has the same chance to be in the sample
+        self.__num_durations += 1
+        if len(self.__durations) < DURATION_SAMPLE_SIZE:
+            self.__durations.append(elapsed)
+        else:
+            idx = random.randrange(self.__num_durations)
+            if idx < DURATION_SAMPLE_SIZE:
+                self.__durations[idx] = elapsed
+
+    def __check_done(self):
+        # must be called with the lock held
+        # items a thread left behind are still claimable by the other threads, so only every item counts
+        if self.__remaining <= 0:
+            self.all_done.set()
+
+
 def sleep_til_next_hour(buffer=0):
     current_time = time.localtime()
     minutes_until_next_hour = 60 - current_time.tm_min + buffer